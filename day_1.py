@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
 
 STRING_TO_DIGIT = {
     "one": 1,
@@ -12,38 +14,177 @@ STRING_TO_DIGIT = {
     "nine": 9,
 }
 
+DIGITS = {str(d): d for d in range(10)}
+
+
+class Automaton:
+    """Aho-Corasick automaton compiled into a complete transition table."""
+
+    def __init__(self, patterns: List[str]):
+        self.goto: List[Dict[str, int]] = [{}]
+        self.matches: List[List[int]] = [[]]  # Indices of patterns ending in each state
+
+        for i, pattern in enumerate(patterns):
+            state = 0
+            for c in pattern:
+                if c not in self.goto[state]:
+                    self.goto.append({})
+                    self.matches.append([])
+                    self.goto[state][c] = len(self.goto) - 1
+                state = self.goto[state][c]
+            self.matches[state].append(i)
+
+        # Breadth first over the trie, filling in failure transitions
+        alphabet = {c for p in patterns for c in p}
+        fail = [0] * len(self.goto)
+        queue = list(self.goto[0].values())
+
+        for state in queue:
+            self.matches[state] += self.matches[fail[state]]
+            for c in alphabet:
+                if c in self.goto[state]:
+                    child = self.goto[state][c]
+                    fail[child] = self.goto[fail[state]].get(c, 0) if state else 0
+                    queue.append(child)
+                elif state:
+                    self.goto[state][c] = self.goto[fail[state]].get(c, 0)
+
+
+class DigitScanner:
+    """Finds the first and last digit in a line, spelled out or not.
+
+    Words are matched by one automaton scanning from the left and one scanning the
+    reversed line from the right, both stopping as soon as the answer is known.
+    When several words start at the same position the earliest one in the
+    vocabulary wins, with digit characters always taking precedence.
+    """
+
+    def __init__(self, words: Optional[Dict[str, int]] = None):
+        vocabulary = {**DIGITS, **(words or {})}
+        self.patterns = list(vocabulary.keys())
+        self.values = list(vocabulary.values())
+        self.lengths = [len(p) for p in self.patterns]
+        self.max_length = max(self.lengths)
+        self.forward = Automaton(self.patterns)
+        self.backward = Automaton([p[::-1] for p in self.patterns])
+
+    def first(self, line: str) -> Optional[int]:
+        goto, matches = self.forward.goto, self.forward.matches
+        state = 0
+        best: Optional[Tuple[int, int]] = None  # (start, pattern index)
+
+        for i, c in enumerate(line):
+            if best is not None and i >= best[0] + self.max_length:
+                break  # No pattern starting at or before best can still end here
+
+            state = goto[state].get(c, 0)
+            for p in matches[state]:
+                candidate = (i - self.lengths[p] + 1, p)
+                if best is None or candidate < best:
+                    best = candidate
+
+        return None if best is None else self.values[best[1]]
+
+    def last(self, line: str) -> Optional[int]:
+        goto, matches = self.backward.goto, self.backward.matches
+        state = 0
+
+        for c in reversed(line):
+            state = goto[state].get(c, 0)
+            if matches[state]:  # All of these start at the same position in line
+                return self.values[min(matches[state])]
+
+        return None
+
+
+DIGIT_SCANNER = DigitScanner()
+STRING_SCANNER = DigitScanner(STRING_TO_DIGIT)
+
 
 def read() -> List[str]:
     with open("input.txt") as file:
         return [x.strip() for x in file.readlines()]
 
 
-def solve(input_: List[str], consider_strings: bool = False) -> int:
+def read_buffer() -> np.ndarray:
+    """Read the whole input as a single byte buffer."""
+    with open("input.txt", "rb") as file:
+        return np.frombuffer(file.read(), dtype=np.uint8)
+
+
+def solve(
+    input_: List[str],
+    consider_strings: bool = False,
+    scanner: Optional[DigitScanner] = None,
+) -> int:
+    if scanner is None:
+        scanner = STRING_SCANNER if consider_strings else DIGIT_SCANNER
+
     result = 0
 
     for line in input_:
-        first, last = None, None
-        for i, c in enumerate(line):
-            digit = None
-            try:
-                int(c)
-                digit = c
-            except ValueError:
-                pass
+        first, last = scanner.first(line), scanner.last(line)
+        result += int(f"{first}{last}")
 
-            if digit is None and consider_strings:
-                for s, d in STRING_TO_DIGIT.items():
-                    if line[i : i + len(s)] == s:
-                        digit = str(d)
-                        break
+    return result
 
-            if digit is not None:
-                first = digit if first is None else first
-                last = digit
 
-        result += int(first + last)
+def solve_buffer(
+    buffer: np.ndarray,
+    consider_strings: bool = False,
+    words: Optional[Dict[str, int]] = None,
+) -> int:
+    """Vectorized version of solve working on the output of read_buffer."""
+    words = (STRING_TO_DIGIT if words is None else words) if consider_strings else {}
+    largest = max(list(words.values()) + [9])
+    dtype = np.int8 if largest <= np.iinfo(np.int8).max else np.int64
 
-    return result
+    # Value of the digit starting at each position, or -1 if there is none
+    values = np.full(len(buffer), -1, dtype=dtype)
+    digits = (buffer >= ord("0")) & (buffer <= ord("9"))
+    values[digits] = buffer[digits] - ord("0")
+    del digits
+
+    if consider_strings:
+        # Only fill in free positions so that earlier words take precedence, like in solve
+        for word, digit in words.items():
+            encoded = np.frombuffer(word.encode(), dtype=np.uint8)
+            n = len(buffer) - len(encoded) + 1
+            if n <= 0:
+                continue
+
+            hits = np.ones(n, dtype=bool)
+            for k, c in enumerate(encoded):
+                hits &= buffer[k : k + n] == c
+
+            values[:n][hits & (values[:n] < 0)] = digit
+
+    newlines = np.flatnonzero(buffer == ord("\n"))
+    if len(buffer) > 0 and buffer[-1] != ord("\n"):  # Last line without a newline
+        newlines = np.append(newlines, len(buffer))
+
+    positions = np.flatnonzero(values >= 0)
+    lines = np.searchsorted(newlines, positions)
+
+    # Hits are sorted by position, so each line's hits form one contiguous segment
+    starts = np.flatnonzero(np.diff(lines, prepend=-1))
+    ends = np.append(starts[1:], len(positions)) - 1
+
+    blank = np.diff(newlines, prepend=-1) - 1 == 0
+    if len(starts) != (~blank).sum():
+        raise ValueError("Found a non-empty line without any digits")
+    if len(positions) == 0:  # Only blank lines
+        return 0
+
+    first = values[positions[starts]].astype(np.int64)
+    last = values[positions[ends]].astype(np.int64)
+
+    # Shift the first digit past all digits of the last one, like int(f"{first}{last}")
+    shift = np.full(len(last), 10, dtype=np.int64)
+    while (last >= shift).any():
+        shift = np.where(last >= shift, shift * 10, shift)
+
+    return int((first * shift + last).sum())
 
 
 def main():
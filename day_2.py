@@ -1,5 +1,11 @@
-from dataclasses import dataclass, fields
-from typing import List
+from dataclasses import dataclass
+from typing import Tuple
+
+import numpy as np
+
+# Column order of the cube counts
+COLORS = ["red", "green", "blue"]
+COLOR_TO_INDEX = {color: i for i, color in enumerate(COLORS)}
 
 
 @dataclass
@@ -11,85 +17,173 @@ class CubeSet:
     def power(self) -> int:
         return self.red * self.blue * self.green
 
+    def to_array(self) -> np.ndarray:
+        return np.array([getattr(self, color) for color in COLORS])
 
-@dataclass
-class Game:
-    id_: int
-    subsets: List[CubeSet]
 
+MAXIMUM = CubeSet(red=12, blue=14, green=13)
 
-def read():
+
+@dataclass
+class Games:
+    """All games stored column-wise."""
+
+    # Id of each game, shape (n_games,)
+    ids: np.ndarray
+
+    # Index of the first subset of each game, shape (n_games,)
+    offsets: np.ndarray
+
+    # Number of cubes of each color in each subset, shape (n_subsets, len(COLORS))
+    counts: np.ndarray
+
+    def get_minimum_subsets(self) -> np.ndarray:
+        """Get the per-color maximum of each game, shape (n_games, len(COLORS))."""
+        return np.maximum.reduceat(self.counts, self.offsets, axis=0)
+
+
+def get_fenwick_blocks(positions: np.ndarray, sizes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Pair every position in a sequence of the given size with the Fenwick blocks containing it.
+
+    Block j covers positions [j - lowbit(j + 1) + 1, j], so a prefix of length k is
+    the union of blocks k - 1, k - 1 - lowbit(k), ... Gets the index into positions
+    and the block of every pair.
+    """
+    elements, blocks = [], []
+    index, j = np.arange(len(positions)), positions + 1
+
+    while len(index) > 0:
+        elements.append(index)
+        blocks.append(j - 1)
+        j = j + (j & -j)
+        keep = j <= sizes[index]
+        index, j = index[keep], j[keep]
+
+    if not elements:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+    return np.concatenate(elements), np.concatenate(blocks)
+
+
+class LimitIndex:
+    """Answers which games are possible for many different bag limits.
+
+    Each game is reduced to its per-color maxima once. The games are sorted by
+    red, and a prefix of them is split into O(log n) Fenwick blocks. Each block
+    holds its games sorted by green, whose prefixes are split into Fenwick
+    blocks again, holding their games sorted by blue with running id sums.
+    This takes O(n log^2 n) memory, and a query is O(log^3 n).
+
+    Segments of the flat arrays are searched together by prefixing every
+    value rank with its segment index.
+    """
+
+    def __init__(self, games: Games):
+        minimum = games.get_minimum_subsets()
+        order = np.argsort(minimum[:, 0], kind="stable")
+        minimum, ids = minimum[order], games.ids[order]
+        self.num_games = n = len(ids)
+
+        self.reds = minimum[:, 0]
+        self.greens = np.unique(minimum[:, 1])
+        self.blues = np.unique(minimum[:, 2])
+        greens = np.searchsorted(self.greens, minimum[:, 1])
+        blues = np.searchsorted(self.blues, minimum[:, 2])
+
+        # Games in each block over red, sorted by green
+        games_, blocks = get_fenwick_blocks(np.arange(n), np.full(n, n))
+        order = np.argsort(blocks * (n + 1) + greens[games_], kind="stable")
+        games_, blocks = games_[order], blocks[order]
+        self.green_keys = blocks * (n + 1) + greens[games_]
+        self.green_starts = np.searchsorted(blocks, np.arange(n + 1))
+
+        # Games in each block over green within a block over red, sorted by blue
+        positions = np.arange(len(games_)) - self.green_starts[blocks]
+        sizes = (blocks + 1) & -(blocks + 1)
+        entries, sub_blocks = get_fenwick_blocks(positions, sizes)
+        sub_blocks += self.green_starts[blocks[entries]]
+        keys = sub_blocks * (n + 1) + blues[games_[entries]]
+        order = np.argsort(keys, kind="stable")
+        self.blue_keys = keys[order]
+        self.blue_starts = np.searchsorted(sub_blocks[order], np.arange(len(games_) + 1))
+        self.sums = np.concatenate([[0], np.cumsum(ids[games_[entries[order]]])])
+
+    def query(self, maximum: CubeSet) -> int:
+        return int(self.query_batch(maximum.to_array()[np.newaxis])[0])
+
+    def query_batch(self, limits: np.ndarray) -> np.ndarray:
+        """Get the id sum of possible games for each row of limits, ordered as COLORS."""
+        limits = np.asarray(limits)
+        n = self.num_games
+
+        num_reds = np.searchsorted(self.reds, limits[:, 0], side="right")
+        num_greens = np.searchsorted(self.greens, limits[:, 1], side="right")
+        num_blues = np.searchsorted(self.blues, limits[:, 2], side="right")
+        result = np.zeros(len(limits), dtype=np.int64)
+
+        # Walk the blocks over red of all queries in lockstep
+        queries = np.flatnonzero(num_reds)
+        while len(queries) > 0:
+            blocks = num_reds[queries] - 1
+            ends = np.searchsorted(self.green_keys, blocks * (n + 1) + num_greens[queries])
+            starts = self.green_starts[blocks]
+            num_games = ends - starts
+
+            # Then the blocks over green within each of them
+            keep = num_games > 0
+            sub_queries, starts, num_games = queries[keep], starts[keep], num_games[keep]
+            while len(sub_queries) > 0:
+                sub_blocks = starts + num_games - 1
+                keys = sub_blocks * (n + 1) + num_blues[sub_queries]
+                ends = np.searchsorted(self.blue_keys, keys)
+                result[sub_queries] += self.sums[ends] - self.sums[self.blue_starts[sub_blocks]]
+
+                num_games -= num_games & -num_games
+                keep = num_games > 0
+                sub_queries, starts, num_games = sub_queries[keep], starts[keep], num_games[keep]
+
+            num_reds[queries] -= num_reds[queries] & -num_reds[queries]
+            queries = queries[num_reds[queries] > 0]
+
+        return result
+
+
+def read() -> Games:
     with open("input.txt") as file:
         lines = [x.strip() for x in file.readlines()]
-        games = []
+        ids, offsets, counts = [], [], []
 
         for line in lines:
             line = line.split("Game ")[1]
             id_, tail = line.split(": ")
-            subsets = []
+            ids.append(int(id_))
+            offsets.append(len(counts) // len(COLORS))
+
             for subset_string in tail.split("; "):
-                subset = CubeSet()
+                subset = [0] * len(COLORS)
 
                 for element in subset_string.split(", "):
                     count, color = element.split(" ")
-                    count = int(count)
-                    setattr(subset, color, count)
-
-                subsets.append(subset)
-
-            games.append(Game(int(id_), subsets))
-
-        return games
-
-
-def subset_is_possible(subset: CubeSet) -> bool:
-    maximum = CubeSet(red=12, blue=14, green=13)
-    return (
-        subset.red <= maximum.red
-        and subset.blue <= maximum.blue
-        and subset.green <= maximum.green
-    )
-
-
-def game_is_possible(game: Game) -> bool:
-    for subset in game.subsets:
-        if not subset_is_possible(subset):
-            return False
-
-    return True
-
-
-def solve_fst(games: List[Game]) -> int:
-    result = 0
-
-    for game in games:
-        if game_is_possible(game):
-            result += game.id_
-
-    return result
-
-
-def get_minimum_subset(game: Game) -> CubeSet:
-    minimum = CubeSet()
+                    subset[COLOR_TO_INDEX[color]] = int(count)
 
-    for subset in game.subsets:
-        for color in fields(minimum):
-            x = getattr(subset, color.name)
-            y = getattr(minimum, color.name)
-            if x > y:
-                setattr(minimum, color.name, x)
+                counts += subset
 
-    return minimum
+        return Games(
+            ids=np.array(ids, dtype=np.int64),
+            offsets=np.array(offsets, dtype=np.int64),
+            counts=np.array(counts, dtype=np.int64).reshape(-1, len(COLORS)),
+        )
 
 
-def solve_snd(games: List[Game]):
-    result = 0
+def solve_fst(games: Games, maximum: CubeSet = MAXIMUM) -> int:
+    minimum = games.get_minimum_subsets()
+    possible = (minimum <= maximum.to_array()).all(axis=1)
+    return int(games.ids[possible].sum())
 
-    for game in games:
-        minimum = get_minimum_subset(game)
-        result += minimum.power()
 
-    return result
+def solve_snd(games: Games) -> int:
+    minimum = games.get_minimum_subsets()
+    return int(minimum.prod(axis=1).sum())
 
 
 def main():
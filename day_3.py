@@ -1,5 +1,9 @@
+from bisect import bisect_right
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Tuple, Set
+from typing import List, Tuple, Set, Iterable, Iterator
+
+import numpy as np
 
 
 @dataclass
@@ -7,9 +11,10 @@ class Part:
     number: int
     row: int
     col: int
+    end: int  # Column after the last digit, leading zeros included
 
     def __hash__(self):
-        return hash(f"{self.row},{self.col}")
+        return hash((self.row, self.col))
 
 
 def is_digit(c: str) -> bool:
@@ -20,78 +25,339 @@ def is_digit(c: str) -> bool:
         return False
 
 
-def read() -> Tuple[List[Part], List[str]]:
+def is_symbol(c: str) -> bool:
+    return not is_digit(c) and c != "."
+
+
+def parse_row(line: str, row: int) -> List[Part]:
+    parts = []
+    col = 0
+
+    while col < len(line):
+        c = line[col]
+        if is_digit(c):  # Check for digits
+            j = col + 1
+            while j < len(line) and is_digit(line[j]):
+                j += 1
+
+            number = int(line[col:j])
+            parts.append(Part(number, row, col, j))
+            col = j
+        else:  # Dot or symbol
+            col += 1
+
+    return parts
+
+
+def read() -> Tuple[List[Part], List[str], np.ndarray]:
+    """Read the parts, the schematic and a grid with the index of the part in each cell (-1 if none)."""
     with open("input.txt") as file:
         lines = [x.strip() for x in file.readlines()]
         parts = []
+        labels = np.full((len(lines), max(map(len, lines), default=0)), -1, dtype=np.int32)
 
         for row, line in enumerate(lines):
-            col = 0
+            for p in parse_row(line, row):
+                labels[row, p.col : p.end] = len(parts)
+                parts.append(p)
+
+        return parts, lines, labels
+
+
+def read_rows() -> Iterator[str]:
+    """Read the schematic one row at a time."""
+    with open("input.txt") as file:
+        for line in file:
+            yield line.strip()
+
+
+def read_grid() -> np.ndarray:
+    """Read the schematic into a 2-D array of character codes."""
+    with open("input.txt", "rb") as file:
+        lines = file.read().split()
+        return np.frombuffer(b"".join(lines), dtype=np.uint8).reshape(len(lines), -1)
+
+
+def dilate(mask: np.ndarray) -> np.ndarray:
+    """Mark every cell that has a marked cell in its 3x3 neighbourhood."""
+    rows = mask.copy()
+    rows[:, 1:] |= mask[:, :-1]
+    rows[:, :-1] |= mask[:, 1:]
+
+    dilated = rows.copy()
+    dilated[1:] |= rows[:-1]
+    dilated[:-1] |= rows[1:]
+
+    return dilated
+
+
+# Every number with at most this many digits fits in int64
+MAX_DIGITS = 18
 
-            while col < len(line):
-                c = line[col]
-                if is_digit(c):  # Check for digits
-                    j = col + 1
-                    while j < len(line) and is_digit(line[j]):
-                        j += 1
 
-                    number = int(line[col:j])
-                    parts.append(Part(number, row, col))
-                    col = j
-                else:  # Dot or symbol
-                    col += 1
+def get_part_numbers(grid: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the number of every part in row-major order and whether it's valid.
 
-        return parts, lines
+    Numbers with more digits than fit in int64 are returned as Python ints in an object array.
+    """
+    digits = (grid >= ord("0")) & (grid <= ord("9"))
+    adjacent = dilate(~digits & (grid != ord("."))).ravel()
+
+    # First and last digit of every number, never crossing a row boundary
+    first = np.empty_like(digits)
+    first[:, 0] = digits[:, 0]
+    np.greater(digits[:, 1:], digits[:, :-1], out=first[:, 1:])
+    last = np.empty_like(digits)
+    last[:, -1] = digits[:, -1]
+    np.greater(digits[:, :-1], digits[:, 1:], out=last[:, :-1])
+
+    grid, last = grid.ravel(), last.ravel()
+    starts = np.flatnonzero(first)
+    numbers = np.zeros(len(starts), dtype=np.int64)
+    valid = np.zeros(len(starts), dtype=bool)
+    lengths = np.zeros(len(starts), dtype=np.int64)
+    active = np.arange(len(starts))
+
+    # Walk all numbers in lockstep one digit at a time, dropping those that have ended
+    for k in range(len(grid)):
+        if len(active) == 0:
+            break
+
+        idx = starts[active] + k
+        numbers[active] = numbers[active] * 10 + (grid[idx] - ord("0"))
+        valid[active] |= adjacent[idx]
+        lengths[active] += 1
+        active = active[~last[idx]]
+
+    # These wrapped around above, parse them again
+    too_long = np.flatnonzero(lengths > MAX_DIGITS)
+    if len(too_long) > 0:
+        numbers = numbers.astype(object)
+        for i in too_long.tolist():
+            numbers[i] = int(grid[starts[i] : starts[i] + lengths[i]].tobytes())
+
+    return numbers, valid
+
+
+def solve_fst(grid: np.ndarray) -> int:
+    numbers, valid = get_part_numbers(grid)
+    numbers = numbers[valid]
+
+    largest = int(numbers.max(initial=0))
+    if numbers.dtype == object or largest.bit_length() + len(numbers).bit_length() >= 63:
+        return sum(numbers.tolist())  # Could overflow, use Python ints instead
+
+    return int(numbers.sum())
 
 
 def part_is_valid(part: Part, schema: List[str]) -> bool:
     for row in range(part.row - 1, part.row + 2):
-        for col in range(part.col - 1, part.col + len(str(part.number)) + 1):
+        for col in range(part.col - 1, part.end + 1):
             if 0 <= row < len(schema) and 0 <= col < len(schema[0]):
                 char = schema[row][col]
-                if not is_digit(char) and char != ".":  # Symbol found!
+                if is_symbol(char):  # Symbol found!
                     return True
 
     return False
 
 
-def get_adjacent_parts(row: int, col: int, parts: List[Part], schema: List[str]) -> Set[Part]:
-    adjacent_parts = set()
+def get_adjacent_parts(row: int, col: int, labels: np.ndarray) -> Set[int]:
+    """Get the indices of all parts in the neighbourhood of a cell."""
+    window = labels[max(row - 1, 0) : row + 2, max(col - 1, 0) : col + 2]
+    return set(window[window >= 0].tolist())
 
-    for i in range(row - 1, row + 2):
-        for j in range(col - 1, col + 2):
-            if 0 <= i < len(schema) and 0 <= j < len(schema[0]):
-                for p in parts:
-                    if i == p.row and p.col <= j < p.col + len(str(p.number)):
-                        adjacent_parts.add(p)
 
-    return adjacent_parts
-
-
-def solve_snd(parts: List[Part], schema: List[str]) -> int:
+def solve_snd(parts: List[Part], schema: List[str], labels: np.ndarray) -> int:
     result = 0
 
     for row, line in enumerate(schema):
         for col, c in enumerate(line):
             if c == "*":  # Could be a gear
-                adjacent_parts = get_adjacent_parts(row, col, parts, schema)
+                adjacent_parts = get_adjacent_parts(row, col, labels)
 
                 if len(adjacent_parts) != 2:  # Not a gear!
                     continue
 
-                adjacent_parts = list(adjacent_parts)
-                gear_ratio = adjacent_parts[0].number * adjacent_parts[1].number
+                i, j = adjacent_parts
+                gear_ratio = parts[i].number * parts[j].number
 
                 result += gear_ratio
 
     return result
 
 
+@dataclass
+class Row:
+    line: str
+    parts: List[Part]
+    cols: List[int]
+
+    @staticmethod
+    def from_line(line: str, row: int) -> "Row":
+        parts = parse_row(line, row)
+        return Row(line, parts, [p.col for p in parts])
+
+    def get_parts_around(self, col: int) -> List[Part]:
+        """Get the parts with a digit in columns col - 1 to col + 1."""
+        parts = []
+
+        # Parts are sorted and disjoint, so walk left from the last one starting in range
+        for i in range(bisect_right(self.cols, col + 1) - 1, -1, -1):
+            p = self.parts[i]
+            if p.end < col:
+                break
+            parts.append(p)
+
+        return parts
+
+
+def evaluate_row(window: List[Row]) -> Tuple[int, int]:
+    """Get the part number and gear ratio sums of the middle row of a three row window."""
+    above, current, below = window
+    part_sum, gear_sum = 0, 0
+
+    for p in current.parts:
+        start, end = p.col - 1, p.end + 1
+        if any(is_symbol(c) for r in window for c in r.line[max(start, 0) : end]):
+            part_sum += p.number
+
+    for col, c in enumerate(current.line):
+        if c == "*":  # Could be a gear
+            adjacent_parts = [p for r in window for p in r.get_parts_around(col)]
+
+            if len(adjacent_parts) == 2:
+                gear_sum += adjacent_parts[0].number * adjacent_parts[1].number
+
+    return part_sum, gear_sum
+
+
+def solve_streaming(rows: Iterable[str]) -> Tuple[int, int]:
+    """Get both answers while only keeping three rows of the schematic in memory."""
+    empty = Row("", [], [])
+    window = deque([empty, empty], maxlen=3)
+    part_sum, gear_sum = 0, 0
+
+    for row, line in enumerate(rows):
+        window.append(Row.from_line(line, row))
+        if len(window) == 3 and window[1] is not empty:
+            parts, gears = evaluate_row(list(window))
+            part_sum, gear_sum = part_sum + parts, gear_sum + gears
+
+    # The last row leaves the window without a row below it
+    window.append(empty)
+    if window[1] is not empty:
+        parts, gears = evaluate_row(list(window))
+        part_sum, gear_sum = part_sum + parts, gear_sum + gears
+
+    return part_sum, gear_sum
+
+
+class Schematic:
+    """A mutable schematic that keeps both answers up to date as cells change.
+
+    An edit can only change the numbers overlapping the 3x3 neighbourhood of
+    the edited cell and the gears next to those numbers. Their contributions
+    are subtracted before the edit and added back after it.
+    """
+
+    def __init__(self, lines: List[str]):
+        self.grid = [list(line) for line in lines]
+        self.part_sum = 0
+        self.gear_sum = 0
+
+        for row, line in enumerate(self.grid):
+            for p in parse_row("".join(line), row):
+                self.part_sum += self._get_part_contribution((row, p.col))
+
+            for col, c in enumerate(line):
+                self.gear_sum += self._get_gear_ratio(row, col)
+
+    def set_cell(self, row: int, col: int, char: str):
+        if not self._in_bounds(row, col):
+            raise ValueError(f"Cell ({row}, {col}) is outside of the schematic")
+        if not isinstance(char, str) or len(char) != 1:
+            raise ValueError(f"Expected a single character, got {char!r}")
+
+        # Every number and gear that can change lies next to the cell or to one of these numbers
+        numbers = self._get_numbers_around(row, col)
+        cells = self._get_cells_around(row, col, col + 1)
+
+        for r, start in numbers:
+            cells |= self._get_cells_around(r, start, self._get_number_end(r, start))
+
+        self.part_sum -= sum(self._get_part_contribution(n) for n in numbers)
+        self.gear_sum -= sum(self._get_gear_ratio(r, c) for r, c in cells)
+
+        self.grid[row][col] = char
+        numbers = self._get_numbers_around(row, col)
+
+        self.part_sum += sum(self._get_part_contribution(n) for n in numbers)
+        self.gear_sum += sum(self._get_gear_ratio(r, c) for r, c in cells)
+
+    def _in_bounds(self, row: int, col: int) -> bool:
+        return 0 <= row < len(self.grid) and 0 <= col < len(self.grid[row])
+
+    def _get_number_start(self, row: int, col: int) -> int:
+        while col > 0 and is_digit(self.grid[row][col - 1]):
+            col -= 1
+        return col
+
+    def _get_number_end(self, row: int, start: int) -> int:
+        end = start
+        while end < len(self.grid[row]) and is_digit(self.grid[row][end]):
+            end += 1
+        return end
+
+    def _get_numbers_around(self, row: int, col: int) -> Set[Tuple[int, int]]:
+        """Get the (row, start col) of all numbers with a digit next to or in a cell."""
+        numbers = set()
+
+        for i in range(row - 1, row + 2):
+            for j in range(col - 1, col + 2):
+                if self._in_bounds(i, j) and is_digit(self.grid[i][j]):
+                    numbers.add((i, self._get_number_start(i, j)))
+
+        return numbers
+
+    def _get_cells_around(self, row: int, start: int, end: int) -> Set[Tuple[int, int]]:
+        """Get all cells next to or in columns start to end (exclusive) of a row."""
+        cells = set()
+
+        for i in range(row - 1, row + 2):
+            for j in range(start - 1, end + 1):
+                if self._in_bounds(i, j):
+                    cells.add((i, j))
+
+        return cells
+
+    def _get_part_contribution(self, number: Tuple[int, int]) -> int:
+        row, start = number
+        end = self._get_number_end(row, start)
+
+        for i, j in self._get_cells_around(row, start, end):
+            if is_symbol(self.grid[i][j]):
+                return int("".join(self.grid[row][start:end]))
+
+        return 0
+
+    def _get_gear_ratio(self, row: int, col: int) -> int:
+        if self.grid[row][col] != "*":
+            return 0
+
+        numbers = list(self._get_numbers_around(row, col))
+        if len(numbers) != 2:  # Not a gear!
+            return 0
+
+        (r1, c1), (r2, c2) = numbers
+        n1 = int("".join(self.grid[r1][c1 : self._get_number_end(r1, c1)]))
+        n2 = int("".join(self.grid[r2][c2 : self._get_number_end(r2, c2)]))
+        return n1 * n2
+
+
 def main():
-    parts, schema = read()
-    parts = [p for p in parts if part_is_valid(p, schema)]
-    print(f"First: {sum([p.number for p in parts])}")
-    print(f"Second: {solve_snd(parts, schema)}")
+    parts, schema, labels = read()
+    print(f"First: {solve_fst(read_grid())}")
+    print(f"Second: {solve_snd(parts, schema, labels)}")
 
 
 if __name__ == "__main__":
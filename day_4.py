@@ -1,11 +1,15 @@
+from collections import deque
 from dataclasses import dataclass
-from typing import Set, List
+from itertools import chain
+from typing import Set, List, Iterable, Iterator, Tuple
+
+import numpy as np
 
 
 @dataclass
 class ScratchCard:
 
-    id_: str
+    id_: int
     winning: Set[int]
     content: Set[int]
 
@@ -28,41 +32,109 @@ def parse_numbers(s: str) -> List[int]:
     return list(map(int, xs))
 
 
+def parse_card(line: str) -> ScratchCard:
+    id_, numbers = line.split(":")
+    id_ = int(id_.split()[-1])
+    winning, content = numbers.split(" | ")
+    winning = parse_numbers(winning)
+    content = parse_numbers(content)
+
+    return ScratchCard(id_, set(winning), set(content))
+
+
 def read() -> List[ScratchCard]:
     with open("input.txt") as file:
         lines = [line.strip() for line in file.readlines()]
-        cards = []
+        return [parse_card(line) for line in lines]
+
+
+def read_lines() -> Iterator[str]:
+    with open("input.txt") as file:
+        for line in file:
+            yield line.strip()
+
+
+def to_bitsets(numbers: List[Set[int]], num_words: int) -> np.ndarray:
+    """Encode each set of numbers as a row of 64-bit words."""
+    rows = np.repeat(np.arange(len(numbers)), [len(s) for s in numbers])
+    values = np.fromiter(chain.from_iterable(numbers), dtype=np.uint64, count=len(rows))
+
+    bitsets = np.zeros((len(numbers), num_words), dtype=np.uint64)
+    np.bitwise_or.at(bitsets, (rows, values // 64), np.uint64(1) << (values % np.uint64(64)))
+
+    return bitsets
 
-        for line in lines:
-            id_, numbers = line.split(":")
-            winning, content = numbers.split(" | ")
-            winning = parse_numbers(winning)
-            content = parse_numbers(content)
 
-            cards.append(ScratchCard(id_, set(winning), set(content)))
+def get_num_wins(cards: List[ScratchCard]) -> np.ndarray:
+    """Get the number of wins of all cards at once by intersecting their bitsets."""
+    largest = max([max(c.winning | c.content, default=0) for c in cards], default=0)
+    num_words = largest // 64 + 1
 
-        return cards
+    winning = to_bitsets([c.winning for c in cards], num_words)
+    content = to_bitsets([c.content for c in cards], num_words)
+    matches = (winning & content).view(np.uint8).reshape(len(cards), num_words * 8)
+
+    return np.unpackbits(matches, axis=1).sum(axis=1)
 
 
 def get_total_points(cards: List[ScratchCard]) -> int:
-    return sum([c.get_points() for c in cards])
+    num_wins = get_num_wins(cards).astype(np.int64)
+
+    # Every card is worth less than 2^max(num_wins)
+    if int(num_wins.max(initial=0)) + len(cards).bit_length() >= 63:
+        return sum(1 << (w - 1) for w in num_wins.tolist() if w > 0)  # Python ints
+
+    points = np.where(num_wins > 0, 1 << np.maximum(num_wins - 1, 0), 0)
+    return int(points.sum())
 
 
 def get_total_number_of_scratchcards(cards: List[ScratchCard]) -> int:
     cards = sorted(cards, key=lambda c: c.id_)
-    card_count = {c.id_: 1 for c in cards}
+    num_wins = get_num_wins(cards).tolist()
 
-    for i, c in enumerate(cards):
-        num_wins = c.get_num_wins()
+    # Copies won by each card are added to a range of later cards through a difference array
+    diff = [0] * (len(cards) + 1)
+    won = 0
+    num_cards = 0
 
-        for j in range(i + 1, i + num_wins + 1):
-            card_count[cards[j].id_] += card_count[c.id_]
+    for i, wins in enumerate(num_wins):
+        won += diff[i]
+        copies = 1 + won
+        num_cards += copies
 
-    num_cards = sum(list(card_count.values()))
+        diff[i + 1] += copies
+        diff[min(i + wins + 1, len(cards))] -= copies
 
     return num_cards
 
 
+def evaluate_stream(lines: Iterable[str]) -> Iterator[Tuple[int, int]]:
+    """Yield the running total points and number of cards after each card.
+
+    Cards must arrive in id order. Only the copies already won for the next
+    cards are kept, which is never more than the number of winning numbers.
+    """
+    pending = deque()
+    total_points = 0
+    num_cards = 0
+
+    for line in lines:
+        card = parse_card(line)
+        copies = 1 + (pending.popleft() if pending else 0)
+        num_wins = card.get_num_wins()
+
+        for i in range(num_wins):
+            if i < len(pending):
+                pending[i] += copies
+            else:
+                pending.append(copies)
+
+        total_points += card.get_points()
+        num_cards += copies
+
+        yield total_points, num_cards
+
+
 def main():
     cards = read()
     print(f"First: {get_total_points(cards)}")
@@ -1,5 +1,13 @@
+import os
+from bisect import bisect_left, bisect_right
+from collections import deque
 from dataclasses import dataclass
-from typing import Tuple, List
+from itertools import chain
+from multiprocessing import Pool
+from multiprocessing.pool import AsyncResult
+from typing import Tuple, List, Optional, Callable, Deque, Iterator
+
+import numpy as np
 
 
 @dataclass
@@ -16,19 +24,69 @@ class Range:
         offset = x - self.src_start
         return self.dst_start + offset
 
+    @property
+    def src_end(self) -> int:
+        return self.src_start + self.length
+
+    @property
+    def dst_end(self) -> int:
+        return self.dst_start + self.length
+
 
 @dataclass
 class Map:
 
     ranges: List[Range]
 
+    def __post_init__(self):
+        self.ranges = sorted(self.ranges, key=lambda r: r.src_start)
+
+        # Parallel lookup tables, the ranges are assumed not to overlap
+        self.starts = [r.src_start for r in self.ranges]
+        self.ends = [r.src_end for r in self.ranges]
+        self.offsets = [r.dst_start - r.src_start for r in self.ranges]
+
     def __call__(self, x: int) -> int:
-        for r in self.ranges:
-            if r.inside(x):
-                return r(x)
+        i = bisect_right(self.starts, x) - 1
+
+        if i >= 0 and x < self.ends[i]:
+            return x + self.offsets[i]
 
         return x
 
+    def apply(self, xs: np.ndarray) -> np.ndarray:
+        """Map an array of values all at once."""
+        if not self.ranges:
+            return xs.copy()
+
+        i = np.maximum(np.searchsorted(self.starts, xs, side="right") - 1, 0)
+        inside = (self.starts[0] <= xs) & (xs < np.asarray(self.ends)[i])
+        return xs + np.where(inside, np.asarray(self.offsets)[i], 0)
+
+    def split(self, start: int, length: int) -> List[Range]:
+        """Map an interval, splitting it into one range per piece that is mapped differently."""
+        end = start + length
+        pieces = []
+
+        for r in self.ranges:
+            if r.src_end <= start:
+                continue
+            if end <= r.src_start:
+                break
+
+            if start < r.src_start:  # Identity gap before this range
+                pieces.append(Range(start, start, r.src_start - start))
+                start = r.src_start
+
+            piece_end = min(end, r.src_end)
+            pieces.append(Range(r(start), start, piece_end - start))
+            start = piece_end
+
+        if start < end:  # Identity gap after the last range
+            pieces.append(Range(start, start, end - start))
+
+        return pieces
+
 
 def read() -> Tuple[List[int], List[Map]]:
     with open("input.txt") as file:
@@ -56,55 +114,276 @@ def read() -> Tuple[List[int], List[Map]]:
         return seeds, maps
 
 
+def apply_maps_to_seed_array(seeds: np.ndarray, maps: List[Map]) -> np.ndarray:
+    for map_ in maps:
+        seeds = map_.apply(seeds)
+
+    return seeds
+
+
 def apply_maps_to_seeds(seeds: List[int], maps: List[Map]) -> int:
-    locations = []
+    locations = apply_maps_to_seed_array(np.array(seeds, dtype=np.int64), maps)
+    return int(locations.min())
 
-    for s in seeds:
-        for map_ in maps:
-            s = map_(s)
 
-        locations.append(s)
+def fuse_maps(maps: List[Map]) -> Map:
+    """Fuse the stack of maps into a single map."""
+    ends = [max(r.src_end, r.dst_end) for m in maps for r in m.ranges]
+    starts = [min(r.src_start, r.dst_start) for m in maps for r in m.ranges]
+    lower, upper = min(starts + [0]), max(ends + [0])
+
+    # Everything outside [lower, upper) is left as is by all maps
+    fused = [Range(lower, lower, upper - lower)]
+
+    for map_ in maps:
+        ranges = []
+
+        for r in fused:
+            for piece in map_.split(r.dst_start, r.length):
+                src_start = r.src_start + piece.src_start - r.dst_start
+                ranges.append(Range(piece.dst_start, src_start, piece.length))
+
+        fused = ranges
+
+    # Merge neighbouring pieces that ended up being mapped the same way
+    merged = fused[:1]
+
+    for r in fused[1:]:
+        last = merged[-1]
+        if last.src_end == r.src_start and last.dst_end == r.dst_start:
+            merged[-1] = Range(last.dst_start, last.src_start, last.length + r.length)
+        else:
+            merged.append(r)
+
+    return Map(merged)
+
+
+# Maps used by the worker processes of the exhaustive search
+_worker_maps: List[Map] = []
 
-    return min(locations)
 
+def _init_worker(maps: List[Map]):
+    global _worker_maps
+    _worker_maps = maps
 
-def apply_maps_to_seed_ranges(seeds: List[int], maps: List[Map]) -> int:
+
+def _get_min_location(chunk: Tuple[int, int]) -> int:
+    start, end = chunk
+    return int(apply_maps_to_seed_array(np.arange(start, end, dtype=np.int64), _worker_maps).min())
+
+
+# Number of seeds mapped at once by a worker of the exhaustive search
+SEED_CHUNK_SIZE = 1_000_000
+
+
+def get_seed_chunks(seeds: List[int], chunk_size: int) -> Iterator[Tuple[int, int]]:
+    """Cut the seed ranges into (start, end) chunks of at most chunk_size seeds."""
+    for i in range(0, len(seeds), 2):
+        start, end = seeds[i], seeds[i] + seeds[i + 1]
+
+        for s in range(start, end, chunk_size):
+            yield s, min(s + chunk_size, end)
+
+
+def apply_maps_to_seed_ranges_exhaustively(
+    seeds: List[int],
+    maps: List[Map],
+    num_workers: Optional[int] = None,
+    chunk_size: int = SEED_CHUNK_SIZE,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Map every single seed, to verify the interval logic.
+
+    The seed ranges are cut into chunks which are mapped by a pool of worker
+    processes, each only returning the minimum location of its chunk. Only
+    two chunks per worker are in flight at any time.
+    Progress is reported as (seeds done, total seeds) after every chunk.
+    """
+    total = sum(seeds[1::2])
+    done = 0
+    minimum = None
+    max_pending = 2 * (num_workers or os.cpu_count() or 1)
+    pending: Deque[Tuple[Tuple[int, int], AsyncResult]] = deque()
+
+    with Pool(num_workers, initializer=_init_worker, initargs=(maps,)) as pool:
+        # A final None drains the remaining chunks
+        for chunk in chain(get_seed_chunks(seeds, chunk_size), [None]):
+            if chunk is not None:
+                pending.append((chunk, pool.apply_async(_get_min_location, (chunk,))))
+
+            while pending and (
+                chunk is None or len(pending) >= max_pending or pending[0][1].ready()
+            ):
+                (start, end), result = pending.popleft()
+                location = result.get()
+                minimum = location if minimum is None else min(minimum, location)
+                done += end - start
+
+                if progress is not None:
+                    progress(done, total)
+
+    if minimum is None:
+        raise ValueError("No seeds to map")
+
+    return minimum
+
+
+def apply_maps_to_seed_ranges(
+    seeds: List[int],
+    maps: List[Map],
+    exhaustive: bool = False,
+    num_workers: Optional[int] = None,
+    chunk_size: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """Get the lowest location for the seed ranges, exhaustively if asked to.
+
+    The remaining options are passed on to apply_maps_to_seed_ranges_exhaustively.
+    """
+    if exhaustive:
+        return apply_maps_to_seed_ranges_exhaustively(
+            seeds,
+            maps,
+            num_workers=num_workers,
+            chunk_size=SEED_CHUNK_SIZE if chunk_size is None else chunk_size,
+            progress=progress,
+        )
+    if num_workers is not None or chunk_size is not None or progress is not None:
+        raise ValueError("Worker options are only used by the exhaustive search")
+
+    fused = fuse_maps(maps)
     locations = []
-    from tqdm import tqdm
 
     for i in range(0, len(seeds), 2):
-        print(f"{i}/{len(seeds)}")
         start = seeds[i]
-        length = seeds[i+1]
-        for s in tqdm(range(start, start + length)):
-            for map_ in maps:
-                s = map_(s)
+        length = seeds[i + 1]
+        locations += [r.dst_start for r in fused.split(start, length)]
 
-            locations.append(s)
+    if not locations:
+        raise ValueError("No seeds to map")
 
     return min(locations)
 
 
-def fuse_maps(maps: List[Map]) -> Map:
-    """Fuse the stack of maps into a single map."""
+def merge_intervals(intervals: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Merge (start, end) intervals into a sorted list of disjoint ones."""
+    merged = []
 
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        elif start < end:
+            merged.append((start, end))
 
-def fuse(idx: int, maps: List[Map]) -> List[Range]:
-    if idx == len(maps) - 1:  # Basecase
-        return maps[idx].ranges
+    return merged
 
-    fused_ranges = []
-    fused_ranges_prior = fuse(idx + 1, maps)
 
-    for r1 in maps[idx].ranges:
-        for r2 in fused_ranges_prior:
-            # Check if ranges are disjoint
-            # If so, no need to do anything
-            if r1.dst_start + r1.length <= r2.src_start or r2.src_start + r2.length <= r1.dst_start:
-                continue
+def get_seed_intervals(seeds: List[int]) -> List[Tuple[int, int]]:
+    """Get the seed ranges as sorted, disjoint (start, end) intervals."""
+    return merge_intervals([(seeds[i], seeds[i] + seeds[i + 1]) for i in range(0, len(seeds), 2)])
+
+
+class ReverseIndex:
+    """Answers which seeds end up at a given range of locations.
+
+    The maps are fused and the result is inverted into a table sorted by
+    location. Several seed ranges may map onto the same locations, so the
+    location axis is cut at every range boundary and each segment lists all
+    pieces of the fused map that cover it. Locations outside the fused map
+    only come from the same seeds.
+    """
+
+    def __init__(self, maps: List[Map]):
+        fused = fuse_maps(maps).ranges
+        self.lower = fused[0].src_start if fused else 0
+        self.upper = fused[-1].src_end if fused else 0
+
+        self.boundaries = sorted({b for r in fused for b in (r.dst_start, r.dst_end)})
+        self.segments: List[List[Range]] = [[] for _ in self.boundaries[1:]]
+
+        for r in fused:
+            for k in range(
+                bisect_left(self.boundaries, r.dst_start), bisect_left(self.boundaries, r.dst_end)
+            ):
+                self.segments[k].append(r)
+
+    def pull_back(self, start: int, end: int) -> List[Range]:
+        """Get the pieces mapping to locations in [start, end), clipped to that interval."""
+        pieces = []
+
+        for lo, hi in ((start, min(end, self.lower)), (max(start, self.upper), end)):
+            if lo < hi:  # Locations outside the fused map
+                pieces.append(Range(lo, lo, hi - lo))
+
+        first = max(bisect_right(self.boundaries, start) - 1, 0)
+        last = min(bisect_left(self.boundaries, end), len(self.segments))
+        seen = set()
+
+        for k in range(first, last):
+            for r in self.segments[k]:
+                lo, hi = max(start, r.dst_start), min(end, r.dst_end)
+                if id(r) not in seen and lo < hi:
+                    seen.add(id(r))
+                    pieces.append(Range(lo, lo - r.dst_start + r.src_start, hi - lo))
+
+        return pieces
+
+    def get_seeds(
+        self, start: int, length: int, seeds: Optional[List[int]] = None
+    ) -> List[Tuple[int, int]]:
+        """Get the (start, length) of all seed intervals that end up in the location range.
+
+        If seeds is given, only seeds inside those seed ranges are returned.
+        """
+        pieces = self.pull_back(start, start + length)
+        intervals = merge_intervals([(p.src_start, p.src_end) for p in pieces])
+
+        if seeds is not None:
+            intervals = intersect_intervals(intervals, get_seed_intervals(seeds))
+
+        return [(lo, hi - lo) for lo, hi in intervals]
+
+    def get_lowest_location(self, seeds: List[int]) -> Optional[int]:
+        """Get the lowest location reachable from the seed ranges, if any."""
+        intervals = get_seed_intervals(seeds)
+        if not intervals:
+            return None
+
+        # Walk the location axis upwards, one segment at a time
+        cuts = [intervals[0][0]] + self.boundaries + [self.lower, self.upper, intervals[-1][1]]
+        cuts = sorted(set(cuts))
+
+        for lo, hi in zip(cuts, cuts[1:]):
+            locations = []
+
+            for p in self.pull_back(lo, hi):
+                overlap = intersect_intervals([(p.src_start, p.src_end)], intervals)
+                locations += [s + p.dst_start - p.src_start for s, _ in overlap]
+
+            if locations:
+                return min(locations)
+
+        return None
+
+
+def intersect_intervals(
+    xs: List[Tuple[int, int]], ys: List[Tuple[int, int]]
+) -> List[Tuple[int, int]]:
+    """Intersect two sorted lists of disjoint (start, end) intervals."""
+    i, j = 0, 0
+    intersection = []
+
+    while i < len(xs) and j < len(ys):
+        lo, hi = max(xs[i][0], ys[j][0]), min(xs[i][1], ys[j][1])
+        if lo < hi:
+            intersection.append((lo, hi))
 
-            if r1.dst_start + r1.length > r2.src_start and 
+        if xs[i][1] < ys[j][1]:
+            i += 1
+        else:
+            j += 1
 
+    return intersection
 
 
 def main():
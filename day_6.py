@@ -1,6 +1,8 @@
 import math
 from typing import List, Tuple
 
+import numpy as np
+
 
 def parse_line(line: str) -> List[int]:
     line = line.split(":")[1]
@@ -26,8 +28,13 @@ def read() -> Tuple[List[int], List[int]]:
         return parse_line(times), parse_line(distances)
 
 
-def get_min_velocity(distance: int, time: int) -> int:
-    return math.floor(distance / time)
+def read_arrays() -> Tuple[np.ndarray, np.ndarray]:
+    with open("input.txt") as file:
+        lines = [x.strip() for x in file.readlines()]
+        times = np.array(lines[0].split(":")[1].split(), dtype=np.int64)
+        distances = np.array(lines[1].split(":")[1].split(), dtype=np.int64)
+
+        return times, distances
 
 
 def get_travelled_distance(velocity: int, max_time: int) -> int:
@@ -35,18 +42,72 @@ def get_travelled_distance(velocity: int, max_time: int) -> int:
     return velocity * remaining
 
 
+def get_num_win_alternatives(max_time: int, best_distance: int) -> int:
+    """Count the velocities v with v * (max_time - v) > best_distance.
+
+    The winning velocities lie strictly between the roots of
+    v^2 - max_time * v + best_distance, which are found with an exact integer
+    square root and then nudged so that ties with the best distance lose.
+    """
+    discriminant = max_time * max_time - 4 * best_distance
+    if discriminant <= 0:
+        return 0
+
+    low = max((max_time - math.isqrt(discriminant)) // 2, 0)
+
+    while low > 0 and get_travelled_distance(low - 1, max_time) > best_distance:
+        low -= 1
+    while low <= max_time and get_travelled_distance(low, max_time) <= best_distance:
+        low += 1
+
+    # The winning velocities are symmetric around max_time / 2
+    high = max_time - low
+    return max(high - low + 1, 0)
+
+
+# Largest time for which max_time ** 2 fits in an int64
+MAX_ARRAY_TIME = 3_037_000_499
+
+
+def get_num_win_alternatives_batch(times: np.ndarray, distances: np.ndarray) -> np.ndarray:
+    """Vectorized get_num_win_alternatives, falling back to Python ints for huge times."""
+    times = np.asarray(times, dtype=np.int64)
+    distances = np.asarray(distances, dtype=np.int64)
+    result = np.zeros(len(times), dtype=np.int64)
+
+    # Only races that can be won at all, and whose numbers fit in an int64
+    half = times // 2
+    fits = (0 <= times) & (times <= MAX_ARRAY_TIME)
+    winnable = fits & (distances < half * (times - half))
+    t, d = times[winnable], distances[winnable]
+
+    root = np.floor(np.sqrt((t * t - 4 * d).astype(np.float64))).astype(np.int64)
+    low = np.clip((t - root) // 2, 0, t)
+
+    # Correct for the rounding of the floating point square root
+    too_high = (low > 0) & ((low - 1) * (t - low + 1) > d)
+    while too_high.any():
+        low -= too_high
+        too_high = (low > 0) & ((low - 1) * (t - low + 1) > d)
+
+    too_low = low * (t - low) <= d
+    while too_low.any():
+        low += too_low
+        too_low = low * (t - low) <= d
+
+    result[winnable] = t - 2 * low + 1
+
+    for i in np.flatnonzero(~fits):
+        result[i] = get_num_win_alternatives(int(times[i]), int(distances[i]))
+
+    return result
+
+
 def solve_fst(times: List[int], distances: List[int]) -> int:
     result = 1
 
     for max_time, best_distance in zip(times, distances):
-        num_win_alternatives = 0
-        min_velocity = get_min_velocity(best_distance, max_time)
-
-        for velocity in range(min_velocity, max_time + 1):
-            if get_travelled_distance(velocity, max_time) > best_distance:
-                num_win_alternatives += 1
-
-        result *= num_win_alternatives
+        result *= get_num_win_alternatives(max_time, best_distance)
 
     return result
 
@@ -59,14 +120,7 @@ def solve_snd(times: List[int], distances: List[int]) -> int:
     time = joint_ints(times)
     best_distance = joint_ints(distances)
 
-    num_win_alternatives = 0
-    min_velocity = get_min_velocity(best_distance, time)
-
-    for velocity in range(min_velocity, time + 1):
-        if get_travelled_distance(velocity, time) > best_distance:
-            num_win_alternatives += 1
-
-    return num_win_alternatives
+    return get_num_win_alternatives(time, best_distance)
 
 
 def main():
@@ -1,8 +1,12 @@
-from collections import defaultdict
-from functools import cached_property
-from typing import List, Dict, Union
+from itertools import islice
+from typing import List, Dict, ClassVar, Iterable, Iterator, Tuple
 from enum import IntEnum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+
+import numpy as np
+
+NUM_CARDS = 13
+HAND_SIZE = 5
 
 
 class Type(IntEnum):
@@ -16,76 +20,33 @@ class Type(IntEnum):
 
     @staticmethod
     def from_cards(cards: List[str]) -> "Type":
-        count = defaultdict(int)
-
-        for c in cards:
-            count[c] += 1
-
-        num_pairs = sum([c == 2 for c in count.values()])
-
-        if len(count) == 1:  # All cards are the same
-            return Type.FiveOfAKind
-        elif any([c == 4 for c in count.values()]):
-            return Type.FourOfAKind
-        elif all([c == 2 or c == 3 for c in count.values()]):
-            return Type.FullHouse
-        elif any([c == 3 for c in count.values()]):
-            return Type.ThreeOfAKind
-        elif num_pairs == 2:
-            return Type.TwoPairs
-        elif num_pairs == 1:
-            return Type.OnePair
-        elif len(count) == 5:
-            return Type.HighCard
-        else:
-            raise ValueError(f"Unknown type for hand: {cards}")
+        return Type(TYPES[encode(Hand.order[c] for c in cards)])
 
     @staticmethod
     def from_cards_with_joker(cards: List[str]) -> "Type":
-        if "J" not in cards or all([c == "J" for c in cards]):
-            return Type.from_cards(cards)
-
-        # This set of cards has both jokers and other cards in it
-        count = defaultdict(int)
-
-        # Count cards of each kind
-        for c in cards:
-            count[c] += 1
-
-        # All kinds of non-joker cards
-        kinds = list([k for k in count.keys() if k != "J"])
-
-        if len(count) == 2:
-            # There's one regular kind of card + jokers
-            return Type.FiveOfAKind
-        elif len(count) == 3 and any(
-            [(i + count["J"]) == 4 for c, i in count.items() if c != "J"]
-        ):
-            # There's two regular kinds of cards + jokers
-            # We end up here if adding all jokers to one of the regular cards yields four
-            return Type.FourOfAKind
-        elif (
-            len(count)
-            == 3
-            # and (count[kinds[1]] + count["J"] == 3 and count[kinds[0]] == 2)
-            # or (count[kinds[0]] + count["J"] == 3 and count[kinds[1]] == 2)
-        ):
-            # There's two regular kinds of cards + jokers
-            # We end up here if adding the jokers to one or the other adds a full house
-            return Type.FullHouse
-        elif len(count) == 4:
-            # We end up here if we have three regular kinds of cards + jokers
-            # This can either be:
-            #   - three unique cards + two jokers, or
-            #   - two unique cards, one pair and one joker
-            # In both cases we can form three of a kind.
-            return Type.ThreeOfAKind
-        elif len(count) == 5:
-            # We end up here if we have four kinds of real cards + a joker
-            # Then we can always form a pair
-            return Type.OnePair
-        else:
-            raise ValueError(f"Unknown type for hand: {cards}")
+        return Type(JOKER_TYPES[encode(Hand.order[c] for c in cards)])
+
+
+def encode(ranks: Iterable) -> int:
+    """Combine card ranks into a base 13 integer, the first card being the most significant.
+
+    Also works on the columns of an (n, HAND_SIZE) array of ranks.
+    """
+    code = 0
+
+    for r in ranks:
+        code = code * NUM_CARDS + r
+
+    return code
+
+
+def get_key(type_: Type, cards: List[str], order: Dict[str, int]) -> int:
+    """Encode a hand as an integer, lower is better.
+
+    The type is the most significant digit, followed by the ranks of the
+    cards in base 13.
+    """
+    return int(type_) * NUM_CARDS**HAND_SIZE + encode(order[c] for c in cards)
 
 
 @dataclass
@@ -93,24 +54,21 @@ class Hand:
     bid: int
     type: Type
     cards: List[str]
+    key: int = field(init=False, repr=False)
 
-    def __lt__(self, other):
-        if self.type != other.type:
-            return self.type < other.type
+    card_order: ClassVar[List[str]] = [
+        "A", "K", "Q", "J", "T", "9", "8", "7", "6", "5", "4", "3", "2"
+    ]
+    order: ClassVar[Dict[str, int]] = {c: i for i, c in enumerate(card_order)}
 
-        for c1, c2 in zip(self.cards, other.cards):
-            if c1 != c2:
-                return self.order[c1] < self.order[c2]
+    def __post_init__(self):
+        self.key = get_key(self.type, self.cards, self.order)
 
-        raise ValueError("Tie!")
-
-    @cached_property
-    def order(self) -> Dict[str, int]:
-        return {c: i for i, c in enumerate(self.card_order)}
+    def __lt__(self, other):
+        if self.key == other.key:
+            raise ValueError("Tie!")
 
-    @cached_property
-    def card_order(self) -> List[str]:
-        return ["A", "K", "Q", "J", "T", "9", "8", "7", "6", "5", "4", "3", "2"]
+        return self.key < other.key
 
 
 @dataclass
@@ -120,15 +78,51 @@ class JokerHand(Hand):
     type: Type
     cards: List[str]
 
+    card_order: ClassVar[List[str]] = [
+        "A", "K", "Q", "T", "9", "8", "7", "6", "5", "4", "3", "2", "J"
+    ]
+    order: ClassVar[Dict[str, int]] = {c: i for i, c in enumerate(card_order)}
+
     @staticmethod
     def from_hand(hand: Hand) -> "JokerHand":
         return JokerHand(
             bid=hand.bid, type=Type.from_cards_with_joker(hand.cards), cards=hand.cards
         )
 
-    @cached_property
-    def card_order(self):
-        return ["A", "K", "Q", "T", "9", "8", "7", "6", "5", "4", "3", "2", "J"]
+
+def build_type_table(joker: bool) -> np.ndarray:
+    """Get the type of every possible hand, indexed by its encoding under Hand.order."""
+    codes = np.arange(NUM_CARDS**HAND_SIZE)
+    cards = codes[:, np.newaxis] // NUM_CARDS ** np.arange(HAND_SIZE) % NUM_CARDS
+    counts = (cards[:, :, np.newaxis] == np.arange(NUM_CARDS)).sum(axis=1)
+
+    if joker:  # Jokers always join the most common other card
+        jokers = counts[:, Hand.order["J"]].copy()
+        counts[:, Hand.order["J"]] = 0
+        counts = np.sort(counts, axis=1)
+        counts[:, -1] += jokers
+    else:
+        counts = np.sort(counts, axis=1)
+
+    first, second = counts[:, -1], counts[:, -2]
+    types = np.full(len(codes), Type.HighCard, dtype=np.int8)
+    types[first == 2] = Type.OnePair
+    types[(first == 2) & (second == 2)] = Type.TwoPairs
+    types[first == 3] = Type.ThreeOfAKind
+    types[(first == 3) & (second == 2)] = Type.FullHouse
+    types[first == 4] = Type.FourOfAKind
+    types[first == 5] = Type.FiveOfAKind
+
+    return types
+
+
+TYPES = build_type_table(joker=False)
+JOKER_TYPES = build_type_table(joker=True)
+
+
+def classify(codes: np.ndarray, joker: bool = False) -> np.ndarray:
+    """Get the types of an array of encoded hands."""
+    return (JOKER_TYPES if joker else TYPES)[codes]
 
 
 def read() -> List[Hand]:
@@ -147,15 +141,172 @@ def read() -> List[Hand]:
 
 
 def get_winnings(hands: List[Hand]) -> int:
-    hands = sorted(hands)
+    keys = np.array([h.key for h in hands], dtype=np.int64)
+    bids = np.array([h.bid for h in hands], dtype=np.int64)
+
+    order = np.argsort(keys)
+    if (np.diff(keys[order]) == 0).any():
+        raise ValueError("Tie!")
+
+    # The best hand has the lowest key and the highest rank
+    ranks = np.arange(len(hands), 0, -1)
+    return int((ranks * bids[order]).sum())
+
+
+def read_lines() -> Iterator[str]:
+    with open("input.txt") as file:
+        for line in file:
+            yield line.strip()
 
-    winnings = 0
 
-    for i, h in enumerate(hands):
-        rank = len(hands) - i
-        winnings += rank * h.bid
+# Every key is below this, see get_key
+NUM_KEYS = (max(Type) + 1) * NUM_CARDS**HAND_SIZE
 
-    return winnings
+
+def get_keys(hands: np.ndarray, joker: bool = False) -> np.ndarray:
+    """Get the keys of an (n, HAND_SIZE) array of card characters, as in get_key."""
+    order = JokerHand.order if joker else Hand.order
+
+    # Lookups from character code to card rank, for the type tables and the key
+    index = np.zeros(256, dtype=np.int64)
+    rank = np.zeros(256, dtype=np.int64)
+    for c in Hand.card_order:
+        index[ord(c)] = Hand.order[c]
+        rank[ord(c)] = order[c]
+
+    types = classify(encode(index[hands].T), joker).astype(np.int64)
+    return types * NUM_CARDS**HAND_SIZE + encode(rank[hands].T)
+
+
+def get_winnings_streaming(
+    lines: Iterable[str], joker: bool = False, chunk_size: int = 1_000_000
+) -> int:
+    """Same as get_winnings, but in fixed memory without creating any hands.
+
+    Hands are marked and their bids stored by key, which gives the rank of
+    every hand once all of them are seen. Ties raise like in get_winnings.
+    """
+    seen = np.zeros(NUM_KEYS, dtype=bool)
+    bid_table = np.zeros(NUM_KEYS, dtype=np.int64)
+    lines = iter(lines)
+
+    while True:
+        chunk = list(islice(lines, chunk_size))
+        if not chunk:
+            break
+
+        hands, bids = zip(*(line.split(" ") for line in chunk))
+        hands = np.frombuffer("".join(hands).encode(), dtype=np.uint8).reshape(-1, HAND_SIZE)
+        bids = np.array(bids, dtype=np.int64)
+        keys = get_keys(hands, joker)
+
+        if seen[keys].any() or len(np.unique(keys)) < len(keys):
+            raise ValueError("Tie!")
+
+        seen[keys] = True
+        bid_table[keys] = bids
+
+    # The best hand has the lowest key and the highest rank
+    used = np.flatnonzero(seen)
+    ranks = range(len(used), 0, -1)
+
+    return sum(rank * bid for rank, bid in zip(ranks, bid_table[used].tolist()))
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of elements with O(log n) updates."""
+
+    def __init__(self, size: int):
+        self.tree = [0] * (size + 1)
+
+    def add(self, i: int, x: int):
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += x
+            i += i & -i
+
+    def prefix_sum(self, i: int) -> int:
+        """Get the sum of elements [0, i)."""
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class Ranking:
+    """Total winnings of a changing set of hands under one ordering.
+
+    A hand's rank is one plus the number of worse hands, i.e. hands with a
+    higher key. Adding a hand also lifts the rank of every better hand by
+    one, so the total changes by its own winnings plus the bids of all
+    better hands.
+    """
+
+    def __init__(self):
+        self.counts = FenwickTree(NUM_KEYS)
+        self.bids = FenwickTree(NUM_KEYS)
+        self.hands: Dict[int, int] = {}  # Bid of the hand with each key
+        self.num_hands = 0
+        self.winnings = 0
+
+    def contains(self, key: int) -> bool:
+        return key in self.hands
+
+    def insert(self, key: int, bid: int):
+        if self.contains(key):
+            raise ValueError("Tie!")
+
+        self.hands[key] = bid
+        self.counts.add(key, 1)
+        self.bids.add(key, bid)
+        self.num_hands += 1
+        self.winnings += self._get_change(key, bid)
+
+    def remove(self, key: int, bid: int):
+        if not self.contains(key):
+            raise ValueError(f"No hand with key {key}")
+        if self.hands[key] != bid:
+            raise ValueError(f"Hand with key {key} has bid {self.hands[key]}, not {bid}")
+
+        del self.hands[key]
+        self.counts.add(key, -1)
+        self.bids.add(key, -bid)
+        self.num_hands -= 1
+        self.winnings -= self._get_change(key, bid)
+
+    def _get_change(self, key: int, bid: int) -> int:
+        """Get the change in winnings from a hand with the given key, excluding itself."""
+        worse = self.num_hands - self.counts.prefix_sum(key + 1)
+        better_bids = self.bids.prefix_sum(key)
+        return (worse + 1) * bid + better_bids
+
+
+class Leaderboard:
+    """Total winnings under both the normal and the joker rules as hands come and go."""
+
+    def __init__(self):
+        self.normal = Ranking()
+        self.joker = Ranking()
+
+    @staticmethod
+    def get_keys(hand: Hand) -> Tuple[int, int]:
+        normal = get_key(Type.from_cards(hand.cards), hand.cards, Hand.order)
+        joker = get_key(Type.from_cards_with_joker(hand.cards), hand.cards, JokerHand.order)
+        return normal, joker
+
+    def insert(self, hand: Hand):
+        normal, joker = self.get_keys(hand)
+        self.normal.insert(normal, hand.bid)
+        self.joker.insert(joker, hand.bid)
+
+    def remove(self, hand: Hand):
+        normal, joker = self.get_keys(hand)
+        self.normal.remove(normal, hand.bid)
+        self.joker.remove(joker, hand.bid)
+
+    def get_winnings(self) -> Tuple[int, int]:
+        return self.normal.winnings, self.joker.winnings
 
 
 def main():
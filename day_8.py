@@ -1,12 +1,14 @@
 from __future__ import annotations
 
+import math
 from collections import defaultdict
-from copy import deepcopy
 from dataclasses import dataclass
-from typing import Tuple, List, Dict
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from typing import Tuple, List, Optional, Sequence
 from enum import IntEnum
 
-from tqdm import tqdm
+import numpy as np
 
 
 class Instruction(IntEnum):
@@ -15,17 +17,33 @@ class Instruction(IntEnum):
 
 
 @dataclass
-class Node:
+class Network:
 
-    id_: str
-    left: Node = None
-    right: Node = None
+    # Id of every node, the nodes are referred to by their index in this list
+    ids: List[str]
 
-    def __repr__(self):
-        return f"{self.left.id_} <- {self.id_} -> {self.right.id_}"
+    # Index of the left and right neighbour of every node
+    left: np.ndarray
+    right: np.ndarray
 
+    # Which nodes are starts and ends for the ghosts
+    is_start: np.ndarray
+    is_end: np.ndarray
 
-def read() -> Tuple[Dict[str, Node], List[Instruction]]:
+    def __post_init__(self):
+        self.index = {id_: i for i, id_ in enumerate(self.ids)}
+
+    def step(self, nodes: np.ndarray, instruction: Instruction) -> np.ndarray:
+        """Move all nodes in the array according to the instruction."""
+        if instruction == Instruction.Left:
+            return self.left[nodes]
+        elif instruction == Instruction.Right:
+            return self.right[nodes]
+        else:
+            raise ValueError()
+
+
+def read() -> Tuple[Network, List[Instruction]]:
     with open("input.txt") as file:
         lines = [x.strip() for x in file.readlines()]
 
@@ -34,120 +52,294 @@ def read() -> Tuple[Dict[str, Node], List[Instruction]]:
             Instruction.Left if i == "L" else Instruction.Right for i in instructions
         ]
 
-        nodes = {}
+        ids = [line.split(" = ")[0] for line in lines[2:]]
+        index = {id_: i for i, id_ in enumerate(ids)}
+        left = np.zeros(len(ids), dtype=np.int32)
+        right = np.zeros(len(ids), dtype=np.int32)
 
-        # Define all nodes without left/right pointers
-        for line in lines[2:]:
-            id_ = line.split(" = ")[0]
-            nodes[id_] = Node(id_=id_)
+        for i, line in enumerate(lines[2:]):
+            neighbors = line.split(" = ")[1]
+            l, r = neighbors[1:-1].split(", ")
+            left[i] = index[l.strip()]
+            right[i] = index[r.strip()]
 
-        # Add left/right pointers to all nodes
-        for line in lines[2:]:
-            id_, neighbors = line.split(" = ")
-            left, right = neighbors[1:-1].split(", ")
+        network = Network(
+            ids=ids,
+            left=left,
+            right=right,
+            is_start=np.array([id_[-1] == "A" for id_ in ids], dtype=bool),
+            is_end=np.array([id_[-1] == "Z" for id_ in ids], dtype=bool),
+        )
 
-            left = nodes[left.strip()]
-            right = nodes[right.strip()]
-            nodes[id_].left = left
-            nodes[id_].right = right
+        return network, instructions
 
-        for node in nodes.values():
-            assert node.left is not None
-            assert node.right is not None
 
-        return nodes, instructions
-
-
-def get_num_steps_to_goal_one_start(
-    nodes: Dict[str, Node], instructions: List[Instruction]
-):
+def get_num_steps_to_goal_one_start(network: Network, instructions: List[Instruction]):
     steps = 0
     at_goal = False
-    current = nodes["AAA"]
+    current = network.index["AAA"]
+    goal = network.index["ZZZ"]
 
     while not at_goal:
         for i in instructions:
-            if current.id_ == "ZZZ":
+            if current == goal:
                 at_goal = True
                 break
 
             steps += 1
-            if i == Instruction.Left:
-                current = current.left
-            elif i == Instruction.Right:
-                current = current.right
-            else:
-                raise ValueError()
+            current = network.right[current] if i == Instruction.Right else network.left[current]
 
     return steps
 
 
-def get_primes(n: int) -> List[int]:
-    primes = []
-    remaining = n
+@dataclass
+class Cycle:
+    """When a single ghost is at an end node.
+
+    The ghost's state is its node together with its position in the
+    instructions. After some initial steps the state repeats with a fixed
+    period, and so do the steps at which the ghost is at an end node.
+    """
+
+    # Number of steps before the ghost enters its cycle
+    tail: int
+
+    # Length of the cycle in steps
+    period: int
+
+    # All steps before tail + period at which the ghost is at an end node
+    ends: List[int]
+
+    def is_at_end(self, step: int) -> bool:
+        if step >= self.tail:
+            step = self.tail + (step - self.tail) % self.period
+
+        return step in self.ends
+
+
+def walk_cycle(
+    left: Sequence[int],
+    right: Sequence[int],
+    is_end: Sequence[int],
+    instructions: List[bool],
+    start: int,
+) -> Cycle:
+    """Find the cycle of a ghost, with the instructions given as whether to go right.
+
+    The network may be given as lists or as integer arrays.
+    """
+    visited = {}
+    ends = []
+    node, step = start, 0
+
+    while (node, step % len(instructions)) not in visited:
+        visited[(node, step % len(instructions))] = step
+        if is_end[node]:
+            ends.append(step)
+
+        node = int(right[node] if instructions[step % len(instructions)] else left[node])
+        step += 1
+
+    tail = visited[(node, step % len(instructions))]
+    return Cycle(tail=tail, period=step - tail, ends=ends)
+
+
+def get_cycle(network: Network, instructions: List[Instruction], start: int) -> Cycle:
+    return walk_cycle(
+        network.left.tolist(),
+        network.right.tolist(),
+        network.is_end.tolist(),
+        [i == Instruction.Right for i in instructions],
+        start,
+    )
+
+
+# Shared memory of the worker processes and the network viewed from it
+_worker_memory: Optional[SharedMemory] = None
+_worker_network: Tuple[np.ndarray, np.ndarray, np.ndarray, List[bool]] = ()
+
+
+def _init_worker(name: str, num_nodes: int, instructions: List[bool]):
+    global _worker_memory, _worker_network
+    _worker_memory = SharedMemory(name=name)
+    left, right, is_end = np.ndarray((3, num_nodes), dtype=np.int32, buffer=_worker_memory.buf)
+    _worker_network = (left, right, is_end, instructions)
+
+
+def _walk_cycle(start: int) -> Cycle:
+    return walk_cycle(*_worker_network, start)
+
+
+def get_cycles(
+    network: Network,
+    instructions: List[Instruction],
+    starts: List[int],
+    num_workers: Optional[int] = None,
+) -> List[Cycle]:
+    """Find the cycles of many ghosts in a pool of worker processes.
+
+    The network is shared with the workers as a single block of shared
+    memory, which they walk in place. The cycles are returned in the same
+    order as the starts.
+    """
+    num_nodes = len(network.ids)
+    memory = SharedMemory(create=True, size=3 * num_nodes * np.dtype(np.int32).itemsize)
+    shared = np.ndarray((3, num_nodes), dtype=np.int32, buffer=memory.buf)
+    shared[:] = [network.left, network.right, network.is_end]
+    initargs = (memory.name, num_nodes, [i == Instruction.Right for i in instructions])
 
-    for i in range(2, n + 1):
-        while remaining % i == 0:
-            primes.append(i)
-            remaining = remaining / i
+    try:
+        with Pool(num_workers, initializer=_init_worker, initargs=initargs) as pool:
+            return pool.map(_walk_cycle, [int(s) for s in starts])
+    finally:
+        del shared
+        memory.close()
+        memory.unlink()
 
-    return primes
+
+def solve_congruences(r1: int, m1: int, r2: int, m2: int) -> Optional[Tuple[int, int]]:
+    """Solve x = r1 (mod m1) and x = r2 (mod m2), giving (x, lcm) or None if impossible."""
+    g = math.gcd(m1, m2)
+    if (r2 - r1) % g != 0:
+        return None
+
+    lcm = m1 // g * m2
+    k = (r2 - r1) // g * pow(m1 // g, -1, m2 // g) % (m2 // g)
+    return (r1 + k * m1) % lcm, lcm
+
+
+# Largest set of residues get_first_common_end combines the ghosts' ends into
+MAX_RESIDUES = 1 << 16
+
+
+def get_first_common_end(cycles: List[Cycle]) -> int:
+    """Get the first step at which all ghosts are at an end node at the same time."""
+    tail = max(c.tail for c in cycles)
+
+    # Before every ghost is in its cycle, just check each end of the first ghost
+    first = cycles[0]
+    candidates = [e for e in first.ends if e < first.tail]
+
+    for e in first.ends:
+        if e >= first.tail:
+            candidates += range(e, tail, first.period)
+
+    for step in sorted(candidates):
+        if all(c.is_at_end(step) for c in cycles):
+            return step
+
+    # After that, each ghost is at an end node on a set of residues modulo its period,
+    # and all ghosts so far on a set of residues modulo the lcm of their periods. Its
+    # size is at most the product of their numbers of ends, so ghosts with few ends go
+    # first and merging stops once it would exceed MAX_RESIDUES.
+    cycles = sorted(cycles, key=lambda c: len(c.ends))
+    residues, modulus = {0}, 1
+
+    while cycles and len(residues) * len(cycles[0].ends) <= MAX_RESIDUES:
+        c = cycles.pop(0)
+
+        # Only residues and ends that agree modulo the gcd have a common solution
+        g = math.gcd(modulus, c.period)
+        ends = defaultdict(set)
+        for e in c.ends:
+            if e >= c.tail:
+                ends[e % g].add(e % c.period)
+
+        combined = set()
+        for r in residues:
+            for e in ends[r % g]:
+                combined.add(solve_congruences(r, modulus, e, c.period)[0])
+
+        residues, modulus = combined, modulus // g * c.period
+        if not residues:
+            raise ValueError("The ghosts are never at end nodes at the same time")
+        if len(residues) == modulus:  # Every step works, start over
+            residues, modulus = {0}, 1
+
+    # Walk the matching steps in order and check the remaining ghosts directly, until
+    # all ghosts are back where they were at the tail
+    offsets = sorted((r - tail) % modulus for r in residues)
+    repeat = math.lcm(modulus, *(c.period for c in cycles))
+
+    for base in range(tail, tail + repeat, modulus):
+        for offset in offsets:
+            if all(c.is_at_end(base + offset) for c in cycles):
+                return base + offset
+
+    raise ValueError("The ghosts are never at end nodes at the same time")
 
 
 def get_num_steps_to_goal_multiple_starts(
-    nodes: Dict[str, Node], instructions: List[Instruction]
+    network: Network,
+    instructions: List[Instruction],
+    parallel: bool = False,
+    num_workers: Optional[int] = None,
 ):
-    steps = 0
-    iterations = 0
-    starts = [node for id_, node in nodes.items() if id_[-1] == "A"]
-    currents = deepcopy(starts)
-    print(f"Num starts: {len(currents)}, {[c.id_ for c in currents]}")
-    ends = dict()
-
-    # For each start, find the step at which it reaches the goal
-    # They'll reach the goal again and again with this periodicity
-    while len(ends) != len(starts):
+    starts = np.flatnonzero(network.is_start)
+    print(f"Num starts: {len(starts)}, {[network.ids[s] for s in starts]}")
+
+    if parallel:
+        cycles = get_cycles(network, instructions, starts, num_workers)
+    else:
+        left, right, is_end = network.left.tolist(), network.right.tolist(), network.is_end.tolist()
+        right_turns = [i == Instruction.Right for i in instructions]
+        cycles = [walk_cycle(left, right, is_end, right_turns, int(s)) for s in starts]
+
+    return get_first_common_end(cycles)
+
+
+class PositionIndex:
+    """Answers where a walker is after any number of steps from any node.
+
+    Walkers start at the beginning of the instructions. The node after each
+    prefix of the instructions is tabulated for every node, as well as the
+    node after 2^j full passes over the instructions. A query of k steps
+    then combines the binary digits of the number of full passes with one
+    prefix lookup for the remaining steps.
+    """
+
+    def __init__(self, network: Network, instructions: List[Instruction]):
+        self.network = network
+        self.prefixes = [np.arange(len(network.ids), dtype=np.int32)]
+
         for i in instructions:
-            for j, c in enumerate(currents):
-                if c.id_[-1] == "Z":
-                    ends[(starts[j].id_, c.id_)] = steps
+            self.prefixes.append(network.step(self.prefixes[-1], i))
 
-            steps += 1
-            if i == Instruction.Left:
-                currents = [c.left for c in currents]
-            elif i == Instruction.Right:
-                currents = [c.right for c in currents]
-            else:
-                raise ValueError()
+        self.prefixes = np.stack(self.prefixes)
+        self.jumps = [self.prefixes[-1]]
 
-        iterations += 1
+    def _extend_jumps(self, passes: int):
+        while 2 ** len(self.jumps) <= passes:
+            jump = self.jumps[-1]
+            self.jumps.append(jump[jump])
 
-    # Find the maximum number of steps
-    # A multiple of this will be the answer
-    max_ = max(ends.values())
-    max_primes = get_primes(max_)
+    def query(self, start: str, steps: int) -> str:
+        node = self.query_batch(np.array([self.network.index[start]]), np.array([steps]))[0]
+        return self.network.ids[node]
 
-    for s in ends.values():
-        if s != max_:
-            for p in get_primes(s):
-                if p not in max_primes:
-                    max_primes.append(p)
+    def query_batch(self, starts: np.ndarray, steps: np.ndarray) -> np.ndarray:
+        """Get the node indices after the given numbers of steps from the start node indices."""
+        steps = np.asarray(steps, dtype=np.int64)
+        if (steps < 0).any():
+            raise ValueError("The number of steps can't be negative")
 
-    result = 1
+        passes, remaining = np.divmod(steps, len(self.prefixes) - 1)
+        self._extend_jumps(int(passes.max(initial=0)))
+        nodes = np.asarray(starts, dtype=np.int32)
 
-    for p in max_primes:
-        result *= p
+        for j, jump in enumerate(self.jumps):
+            nodes = np.where((passes >> j) & 1 == 1, jump[nodes], nodes)
 
-    return result
+        return self.prefixes[remaining, nodes]
 
 
 def main():
-    nodes, instructions = read()
+    network, instructions = read()
 
-    steps = get_num_steps_to_goal_one_start(nodes, instructions)
+    steps = get_num_steps_to_goal_one_start(network, instructions)
     print(f"Num steps: {steps}")
 
-    steps = get_num_steps_to_goal_multiple_starts(nodes, instructions)
+    steps = get_num_steps_to_goal_multiple_starts(network, instructions)
     print(f"Num steps: {steps}")
 
 
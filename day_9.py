@@ -1,4 +1,7 @@
-from typing import List, Tuple
+from collections import defaultdict
+from functools import lru_cache
+from math import comb
+from typing import List, Tuple, Iterable
 import numpy as np
 
 
@@ -26,15 +29,121 @@ def extrapolate_backward(sequence: np.ndarray) -> int:
     return extrapolate_helper(sequence, idx=0, sign=-1)
 
 
+@lru_cache(maxsize=None)
+def get_weights(length: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the weights giving the next and previous value of a sequence of the given length.
+
+    Extrapolating through the difference table is the same as taking an
+    alternating binomial combination of the values.
+    """
+    forward = [(-1) ** (length - 1 - i) * comb(length, i) for i in range(length)]
+    backward = [(-1) ** i * comb(length, i + 1) for i in range(length)]
+    return np.array(forward, dtype=object), np.array(backward, dtype=object)
+
+
+def extrapolate_batch(sequences: List[np.ndarray]) -> Tuple[List[int], List[int]]:
+    """Extrapolate all sequences forward and backward, grouping them by length."""
+    forward = [0] * len(sequences)
+    backward = [0] * len(sequences)
+    groups = defaultdict(list)
+
+    for i, s in enumerate(sequences):
+        groups[len(s)].append(i)
+
+    for length, indices in groups.items():
+        values = np.stack([sequences[i] for i in indices])
+        weights = get_weights(length)
+
+        # The weights sum to at most 2^length in absolute value
+        largest = int(np.abs(values).max(initial=0))
+        if length + largest.bit_length() < 63:
+            values = values.astype(np.int64)
+            results = [values @ w.astype(np.int64) for w in weights]
+        else:  # Could overflow, use Python ints instead
+            results = [values.astype(object) @ w for w in weights]
+
+        for i, f, b in zip(indices, results[0].tolist(), results[1].tolist()):
+            forward[i] = f
+            backward[i] = b
+
+    return forward, backward
+
+
 def get_sums_of_extrapolated_values(sequences: List[np.ndarray]) -> Tuple[int, int]:
-    forward_sum = 0
-    backward_sum = 0
+    forward, backward = extrapolate_batch(sequences)
+    return sum(forward), sum(backward)
+
+
+def generalized_comb(n: int, k: int) -> int:
+    """Binomial coefficient that also works for negative n."""
+    result = 1
+
+    for i in range(k):
+        result = result * (n - i) // (i + 1)
+
+    return result
+
+
+class OnlineExtrapolator:
+    """Extrapolates a sequence that grows one value at a time.
+
+    Only the last and the first diagonal of the difference table are kept,
+    i.e. the k:th differences at the end and at the start of the sequence,
+    without trailing zeros. Their length is the degree of the sequence plus
+    one, which bounds the cost of every operation.
+    """
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.num_values = 0
+        self.last: List[int] = []
+        self.first: List[int] = []
+
+        for v in values:
+            self.append(v)
+
+    def append(self, value: int):
+        last = [int(value)]
+
+        # Differences beyond the old diagonal were zero and stay equal to the top level
+        for k in range(1, self.num_values + 1):
+            below = self.last[k - 1] if k - 1 < len(self.last) else 0
+            last.append(last[k - 1] - below)
+            if k >= len(self.last) and last[k] == 0:
+                break
+
+        self.num_values += 1
+        self.last = self._trim(last)
+
+        # The new top level has a single element, shared by both diagonals
+        if len(self.last) == self.num_values:
+            self.first = self.first + [0] * (self.num_values - 1 - len(self.first))
+            self.first.append(self.last[-1])
+
+    @staticmethod
+    def _trim(diagonal: List[int]) -> List[int]:
+        while diagonal and diagonal[-1] == 0:
+            diagonal.pop()
+        return diagonal
+
+    def predict(self, offset: int = 1) -> int:
+        """Get the value offset steps after the last one."""
+        return sum(generalized_comb(offset + k - 1, k) * d for k, d in enumerate(self.last))
+
+    def predict_backward(self, offset: int = 1) -> int:
+        """Get the value offset steps before the first one."""
+        return sum(generalized_comb(-offset, k) * d for k, d in enumerate(self.first))
+
+    def predict_next(self, num_values: int) -> List[int]:
+        """Get the next values, assuming that the highest difference stays constant."""
+        last = list(self.last)
+        values = []
 
-    for s in sequences:
-        forward_sum += extrapolate_forward(s)
-        backward_sum += extrapolate_backward(s)
+        for _ in range(num_values):
+            for k in range(len(last) - 2, -1, -1):
+                last[k] += last[k + 1]
+            values.append(last[0] if last else 0)
 
-    return forward_sum, backward_sum
+        return values
 
 
 def main():